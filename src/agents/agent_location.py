@@ -1,8 +1,20 @@
+import asyncio
 from datetime import timedelta
 from typing import List
 from pydantic import BaseModel
 from restack_ai.agent import agent, log
-from src.functions.location_numbers import LocationParams, get_location_numbers, HackathonInfo, LocationResponse
+from src.functions.location_numbers import (
+    LocationBatchParams,
+    LocationParams,
+    LocationResponse,
+    HackathonInfo,
+    get_location_numbers,
+    get_location_numbers_batch,
+)
+
+# Location events arriving within this window (e.g. a continuous map
+# drag) are coalesced into a single batched search step.
+BATCH_WINDOW_SECONDS = 0.05
 
 class LocationEvent(BaseModel):
     lat: float
@@ -16,45 +28,75 @@ class AgentLocation:
     def __init__(self) -> None:
         self.end = False
         self.locations = []
+        self._pending = []
+        self._flush_task = None
+        self._end_event = asyncio.Event()
 
     @agent.event
     async def location(self, params: LocationEvent) -> List[HackathonInfo]:
         try:
             log.info(f"Received location event: lat={params.lat}, lng={params.lng}")
-            
-            # raw_response = await agent.step(
-            #     get_location_numbers,
-            #     LocationParams(lat=params.lat, lng=params.lng),
-            #     start_to_close_timeout=timedelta(seconds=30),
-            # )
-            raw_response = await agent.step(
-                get_location_numbers,
-                LocationParams(lat=params.lat, lng=params.lng),
-                start_to_close_timeout=timedelta(seconds=180),  # Increased timeout for API calls
-            )
+
+            # Enqueue the event and share one batched remote call with
+            # any other events arriving inside the flush window
+            fut = asyncio.get_event_loop().create_future()
+            self._pending.append((fut, params))
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_after(BATCH_WINDOW_SECONDS))
+
+            raw_response = await fut
             # Explicitly validate the response
             response = LocationResponse(hackathons=raw_response.hackathons if hasattr(raw_response, 'hackathons') else [])
-            
+
             self.locations.append({
                 'lat': params.lat,
                 'lng': params.lng,
                 'hackathons': response.hackathons
             })
-            
+
             log.info(f"Found hackathons for location: {response.hackathons}")
             return response.hackathons
-            
+
         except Exception as e:
             log.error(f"Error during location event: {e}")
             return []
 
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        pending, self._pending = self._pending, []
+        self._flush_task = None
+
+        try:
+            batch = await agent.step(
+                get_location_numbers_batch,
+                LocationBatchParams(
+                    locations=[LocationParams(lat=p.lat, lng=p.lng) for _, p in pending]
+                ),
+                start_to_close_timeout=timedelta(seconds=180),  # Increased timeout for API calls
+            )
+            responses = batch.responses if hasattr(batch, 'responses') else []
+            for (fut, _), response in zip(pending, responses):
+                if not fut.done():
+                    fut.set_result(response)
+            # Guard against a short response list
+            for fut, _ in pending[len(responses):]:
+                if not fut.done():
+                    fut.set_result(LocationResponse(hackathons=[]))
+        except Exception as e:
+            for fut, _ in pending:
+                if not fut.done():
+                    fut.set_exception(e)
+
     @agent.event
     async def end(self, end: EndEvent) -> EndEvent:
         log.info("Received end event")
         self.end = True
+        self._end_event.set()
         return {"end": True}
 
     @agent.run
     async def run(self, input: dict):
-        await agent.condition(lambda: self.end)
+        # Event-driven wait: the coroutine idles until end() wakes it
+        # instead of re-evaluating a polled predicate
+        await self._end_event.wait()
         return
\ No newline at end of file
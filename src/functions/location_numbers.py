@@ -1,152 +1,371 @@
 from restack_ai.function import function, log
-from pydantic import BaseModel
-from typing import List, Optional
-import aiohttp
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import atexit
+import httpx
+import orjson
 import os
-from datetime import datetime, timedelta
+import re
+import time
+from datetime import date
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Reverse-geocoding cache: coordinates are quantized to ~100m (3 decimal
+# places at zoom=10, matching Nominatim's resolution), so nearby points
+# share an entry and skip the network round-trip entirely.
+_GEOCODE_CACHE_MAXSIZE = 4096
+_GEOCODE_CACHE_TTL = 24 * 60 * 60  # seconds
+_geocode_cache: "OrderedDict[Tuple[float, float], Tuple[float, Tuple[str, ...]]]" = OrderedDict()
+_geocode_cache_lock = asyncio.Lock()
+
+# One shared HTTP/2 client for both Nominatim and Tavily: requests are
+# multiplexed over kept-alive connections so repeat calls skip DNS, TCP
+# and TLS setup entirely. Explicit timeouts keep a slow upstream from
+# holding transfers open indefinitely.
+_HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+_HTTP_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+_TAVILY_TIMEOUT = httpx.Timeout(25.0, connect=3.0)
+_NOMINATIM_HEADERS = {'User-Agent': 'HackathonFinder/1.0'}
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            limits=_HTTP_LIMITS,
+            timeout=_HTTP_TIMEOUT,
+        )
+    return _http_client
+
+
+def _close_http_client() -> None:
+    if _http_client is not None and not _http_client.is_closed:
+        try:
+            asyncio.run(_http_client.aclose())
+        except RuntimeError:
+            pass
+
+
+atexit.register(_close_http_client)
+
+
+async def _reverse_geocode(lat_q: float, lng_q: float) -> Optional[Tuple[str, ...]]:
+    """Resolve quantized coordinates to (city, state, country) parts via Nominatim.
+
+    Results are cached in a bounded LRU with a 24h TTL so repeat lookups
+    for the same grid cell never hit the network. Returns None if the
+    lookup fails, letting the caller fall back to raw coordinates.
+    """
+    key = (lat_q, lng_q)
+    now = time.monotonic()
+
+    async with _geocode_cache_lock:
+        cached = _geocode_cache.get(key)
+        if cached is not None:
+            expires_at, value = cached
+            if expires_at > now:
+                _geocode_cache.move_to_end(key)
+                return value
+            del _geocode_cache[key]
+
+    client = _get_http_client()
+    response = await client.get(
+        f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat_q}&lon={lng_q}&zoom=10",
+        headers=_NOMINATIM_HEADERS,
+    )
+    if response.status_code != 200:
+        return None
+    location_data = orjson.loads(response.content)
+
+    address = location_data.get('address', {})
+    city = address.get('city') or address.get('town') or address.get('village')
+    state = address.get('state')
+    country = address.get('country')
+    parts = tuple(p for p in [city, state, country] if p)
+
+    async with _geocode_cache_lock:
+        _geocode_cache[key] = (now + _GEOCODE_CACHE_TTL, parts)
+        _geocode_cache.move_to_end(key)
+        while len(_geocode_cache) > _GEOCODE_CACHE_MAXSIZE:
+            _geocode_cache.popitem(last=False)
+
+    return parts
+
+# These DTOs are constructed per result and per event; the frozen/ignore
+# config lets pydantic skip mutability bookkeeping and unknown-field
+# handling on that hot path.
 class HackathonInfo(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     name: str
     description: str
     location: Optional[str] = None
     date: Optional[str] = None
 
 class LocationParams(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     lat: float
     lng: float
 
 class LocationResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     hackathons: List[HackathonInfo]
 
+class LocationBatchParams(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    locations: List[LocationParams]
+
+class LocationBatchResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    responses: List[LocationResponse]
+
+# Precompiled phrase alternations so each filter check is a single
+# C-level scan over the content instead of one pass per phrase.
+_GENERIC_TITLE_RE = re.compile(
+    r"upcoming hackathons|hackathon list|events near|"
+    r"find hackathons|hackathon calendar|all events"
+)
+_REGISTRATION_RE = re.compile(
+    r"register now|registration open|sign up|join now|participate|apply now"
+)
+_TITLE_SEP_RE = re.compile(r"[:|\-–]")
+_MAX_FILTERED_RESULTS = 10
+
+
+def _build_location_matcher(location_terms):
+    """Return a predicate testing whether any location term occurs in content.
+
+    With pyahocorasick installed all terms are matched in one automaton
+    pass over the content; otherwise a compiled regex alternation gives a
+    single-pass stdlib fallback.
+    """
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for term in location_terms:
+            automaton.add_word(term, term)
+        automaton.make_automaton()
+
+        def matcher(content: str) -> bool:
+            for _ in automaton.iter(content):
+                return True
+            return False
+
+        return matcher
+
+    location_re = re.compile("|".join(re.escape(term) for term in location_terms))
+    return lambda content: bool(location_re.search(content))
+
+# Tavily search cache: nearby coordinates often reverse-geocode to the
+# same location parts and hence an identical query string, so repeat
+# searches become dict lookups instead of ~1s paid API round-trips.
+_TAVILY_CACHE_MAXSIZE = 1024
+_TAVILY_CACHE_TTL = 60 * 60  # seconds
+_TAVILY_RESULT_FIELDS = ("title", "snippet", "published_date", "url")
+_tavily_cache: "OrderedDict[str, Tuple[float, List[dict]]]" = OrderedDict()
+_tavily_cache_lock = asyncio.Lock()
+
+
+async def _tavily_search(search_query: str) -> List[dict]:
+    """POST a search query to Tavily and return the raw result list.
+
+    Responses are cached per query string for an hour. Only the fields
+    the filter and DTOs consume are kept, and hits return copies so
+    downstream title cleanup cannot mutate cached entries.
+    """
+    now = time.monotonic()
+    async with _tavily_cache_lock:
+        cached = _tavily_cache.get(search_query)
+        if cached is not None:
+            expires_at, value = cached
+            if expires_at > now:
+                _tavily_cache.move_to_end(search_query)
+                return [dict(r) for r in value]
+            del _tavily_cache[search_query]
+
+    tavily_api_key = os.getenv("TAVILY_API_KEY")
+    client = _get_http_client()
+    response = await client.post(
+        "https://api.tavily.com/search",
+        content=orjson.dumps({
+            "api_key": tavily_api_key,
+            "query": search_query,
+            "search_depth": "advanced",
+            "max_results": 20,
+            "sort_by": "relevance"
+        }),
+        headers={"Content-Type": "application/json"},
+        timeout=_TAVILY_TIMEOUT,
+    )
+    if response.status_code != 200:
+        log.error(f"Tavily API request failed with status {response.status_code}")
+        return []
+    data = orjson.loads(response.content)
+    results = [
+        {field: r.get(field) for field in _TAVILY_RESULT_FIELDS if field in r}
+        for r in data.get("results", [])
+    ]
+
+    async with _tavily_cache_lock:
+        _tavily_cache[search_query] = (now + _TAVILY_CACHE_TTL, results)
+        _tavily_cache.move_to_end(search_query)
+        while len(_tavily_cache) > _TAVILY_CACHE_MAXSIZE:
+            _tavily_cache.popitem(last=False)
+
+    return [dict(r) for r in results]
+
+# The search query is a constant template with only the location parts
+# and the year pair varying, so the constant pieces live at module scope
+# and the year-dependent suffix is rebuilt at most once per day.
+_QUERY_PREFIX = (
+    '("hackathon" OR "coding competition" OR "tech conference" OR "developer event") AND ('
+)
+_QUERY_SUFFIX_TEMPLATE = (
+    ') AND (("{}" OR "{}") OR "upcoming" OR "scheduled") '
+    'AND ("registration open" OR "register now" OR "sign up") '
+    '-"past" -"completed" -"ended" -"archive"'
+)
+_date_cache: Optional[Tuple[date, Tuple[str, str], str]] = None
+
+
+def _query_parts() -> Tuple[Tuple[str, str], str]:
+    """Return the (year_strs, query_suffix) pair, recomputed daily."""
+    global _date_cache
+    today = date.today()
+    if _date_cache is None or _date_cache[0] != today:
+        year = today.year
+        year_strs = (str(year), str(year + 1))
+        _date_cache = (today, year_strs, _QUERY_SUFFIX_TEMPLATE.format(*year_strs))
+    return _date_cache[1], _date_cache[2]
+
+
+# Single-flight map: concurrent searches for the same rounded
+# coordinates share one in-flight future instead of each issuing its
+# own Nominatim + Tavily round-trip. No lock is needed since asyncio
+# runs these handlers on a single event loop.
+_inflight: "dict[Tuple[float, float], asyncio.Future]" = {}
+
+
 async def search_hackathons(lat: float, lng: float) -> List[dict]:
+    key = (round(lat, 2), round(lng, 2))
+    existing = _inflight.get(key)
+    if existing is not None:
+        return await existing
+
+    fut = asyncio.get_event_loop().create_future()
+    _inflight[key] = fut
+    try:
+        results = await _search_hackathons(lat, lng)
+        fut.set_result(results)
+        return results
+    except Exception as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        del _inflight[key]
+
+
+async def _search_hackathons(lat: float, lng: float) -> List[dict]:
     tavily_api_key = os.getenv("TAVILY_API_KEY")
     if not tavily_api_key:
         log.error("TAVILY_API_KEY not found in environment variables")
         return []
-    
-    # Get approximate location name using reverse geocoding
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(
-                f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat}&lon={lng}&zoom=10",
-                headers={'User-Agent': 'HackathonFinder/1.0'}
-            ) as response:
-                if response.status == 200:
-                    location_data = await response.json()
-                    address = location_data.get('address', {})
-                    city = address.get('city') or address.get('town') or address.get('village')
-                    state = address.get('state')
-                    country = address.get('country')
-                    
-                    location_parts = [p for p in [city, state, country] if p]
-                    location_string = ", ".join(location_parts)
-                    search_locations = [f'"{p}"' for p in location_parts if p]
-                    log.info(f"Location resolved to: {location_string}")
-                else:
-                    location_string = f"{lat:.2f}, {lng:.2f}"
-                    search_locations = [location_string]
-                    log.warning(f"Could not resolve location, using coordinates: {location_string}")
-        except Exception as e:
-            log.error(f"Error getting location name: {e}")
+
+    # Overlap the two independent round-trips: kick off reverse geocoding
+    # and a speculative coarse coordinate-based Tavily search together. If
+    # the location resolves quickly we cancel the coarse search and issue
+    # a refined query; otherwise the coarse results are already in flight.
+    coarse_query = f"hackathon near {lat:.2f},{lng:.2f}"
+    nom_task = asyncio.create_task(_reverse_geocode(round(lat, 3), round(lng, 3)))
+    coarse_task = asyncio.create_task(_tavily_search(coarse_query))
+
+    location_parts = None
+    try:
+        location_parts = await asyncio.wait_for(nom_task, timeout=0.8)
+    except asyncio.TimeoutError:
+        log.warning("Reverse geocoding timed out, falling back to coarse coordinate search")
+    except Exception as e:
+        log.error(f"Error getting location name: {e}")
+
+    year_strs, query_suffix = _query_parts()
+    try:
+        if location_parts:
+            coarse_task.cancel()
+            location_string = ", ".join(location_parts)
+            search_locations = [f'"{p}"' for p in location_parts]
+            log.info(f"Location resolved to: {location_string}")
+
+            # Only the location alternation varies between the constant
+            # prefix and the daily-cached suffix
+            search_query = _QUERY_PREFIX + " OR ".join(search_locations) + query_suffix
+            log.info(f"Using enhanced search query: {search_query}")
+            results = await _tavily_search(search_query)
+        else:
             location_string = f"{lat:.2f}, {lng:.2f}"
-            search_locations = [location_string]
-
-    # Improved search query with more specific terms and date context
-    current_year = datetime.now().year
-    search_query = (
-        f'("hackathon" OR "coding competition" OR "tech conference" OR "developer event") '
-        f'AND ({" OR ".join(search_locations)}) '
-        f'AND (("{current_year}" OR "{current_year + 1}") OR "upcoming" OR "scheduled") '
-        f'AND ("registration open" OR "register now" OR "sign up") '
-        f'-"past" -"completed" -"ended" -"archive"'
+            log.warning(f"Could not resolve location, using coordinates: {location_string}")
+            results = await coarse_task
+
+        log.info(f"Initial search returned {len(results)} results")
+        return _filter_results(results, location_string, year_strs)
+    except Exception as e:
+        log.error(f"Error calling Tavily API: {str(e)}")
+        return []
+
+
+def _filter_results(results: List[dict], location_string: str, year_strs: Tuple[str, str]) -> List[dict]:
+    """Apply the location/date/registration filter and title cleanup."""
+    filtered_results = []
+    location_terms = set(location_string.lower().split(", "))
+    location_matches = _build_location_matcher(location_terms)
+
+    for result in results:
+        # Lowercase each field exactly once and join without
+        # intermediate f-string temporaries
+        title_lc = (result.get("title") or "").lower()
+        content = " ".join((
+            title_lc,
+            (result.get("snippet") or "").lower(),
+        ))
+
+        # Enhanced filtering criteria
+        location_match = location_matches(content)
+                
+        # Check for date indicators
+        has_date = any(year_str in content for year_str in year_strs)
+        is_upcoming = "upcoming" in content or "scheduled" in content
+                
+        # Check if it's a specific event
+        is_specific_event = not _GENERIC_TITLE_RE.search(title_lc)
+
+        # Check for registration indicators
+        has_registration = bool(_REGISTRATION_RE.search(content))
+                
+        if location_match and is_specific_event and (has_date or is_upcoming) and has_registration:
+            # Clean up the title: keep everything before the first separator
+            clean_title = _TITLE_SEP_RE.split(result.get("title", ""), maxsplit=1)[0].strip()
+            result["title"] = clean_title
+            filtered_results.append(result)
+            # Tavily sorts by relevance, so once the cap is reached the
+            # remaining results would be discarded anyway
+            if len(filtered_results) >= _MAX_FILTERED_RESULTS:
+                break
+
+    log.info(
+        f"Filtering complete: {len(results)} initial results -> "
+        f"{len(filtered_results)} final results"
     )
-    log.info(f"Using enhanced search query: {search_query}")
-    
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                "https://api.tavily.com/search",
-                json={
-                    "api_key": tavily_api_key,
-                    "query": search_query,
-                    "search_depth": "advanced",
-                    "max_results": 20,
-                    "sort_by": "relevance",
-                    "include_raw_content": True
-                }
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    results = data.get("results", [])
-                    log.info(f"Initial search returned {len(results)} results")
-                    
-                    filtered_results = []
-                    location_terms = set(location_string.lower().split(", "))
-                    
-                    for result in results:
-                        # Safely get content fields with fallbacks
-                        title = result.get("title", "").lower() or ""
-                        snippet = result.get("snippet", "").lower() or ""
-                        raw_content = result.get("raw_content", "").lower() or ""
-                        
-                        # Combine all content for analysis
-                        content = f"{title} {snippet} {raw_content}"
-                        
-                        log.info(f"Processing result: {result.get('title', '')}")
-                        log.debug(f"Content length: {len(content)} chars")
-                        
-                        # Enhanced filtering criteria
-                        location_match = any(term.lower() in content for term in location_terms)
-                        
-                        # Check for date indicators
-                        has_date = any(str(year) in content for year in range(current_year, current_year + 2))
-                        is_upcoming = "upcoming" in content or "scheduled" in content
-                        
-                        # Check if it's a specific event
-                        is_specific_event = not any(generic in title for generic in [
-                            "upcoming hackathons", "hackathon list", "events near",
-                            "find hackathons", "hackathon calendar", "all events"
-                        ])
-                        
-                        # Check for registration indicators
-                        has_registration = any(term in content for term in [
-                            "register now", "registration open", "sign up",
-                            "join now", "participate", "apply now"
-                        ])
-                        
-                        if location_match and is_specific_event and (has_date or is_upcoming) and has_registration:
-                            # Clean up the title
-                            clean_title = result.get("title", "")
-                            for separator in [":", "|", "-", "–"]:
-                                if separator in clean_title:
-                                    clean_title = clean_title.split(separator)[0].strip()
-                            
-                            result["title"] = clean_title
-                            filtered_results.append(result)
-                            log.info(f"Accepted result: {clean_title}")
-                            log.debug(f"Match criteria - Location: {location_match}, Date: {has_date}, "
-                                    f"Registration: {has_registration}")
-                        else:
-                            log.debug(
-                                f"Filtered out: {result.get('title', '')} - "
-                                f"Location match: {location_match}, "
-                                f"Specific event: {is_specific_event}, "
-                                f"Has date: {has_date}, "
-                                f"Has registration: {has_registration}"
-                            )
-                    
-                    final_results = filtered_results[:10]
-                    log.info(
-                        f"Filtering complete: {len(results)} initial results -> "
-                        f"{len(filtered_results)} filtered -> {len(final_results)} final results"
-                    )
-                    return final_results
-                else:
-                    log.error(f"Tavily API request failed with status {response.status}")
-                    return []
-        except Exception as e:
-            log.error(f"Error calling Tavily API: {str(e)}")
-            return []
+    return filtered_results
 
 @function.defn()
 async def get_location_numbers(params: LocationParams) -> LocationResponse:
@@ -168,4 +387,75 @@ async def get_location_numbers(params: LocationParams) -> LocationResponse:
         return LocationResponse(hackathons=hackathons)
     except Exception as e:
         log.error("location_numbers function failed", error=e)
-        return LocationResponse(hackathons=[])
\ No newline at end of file
+        return LocationResponse(hackathons=[])
+
+
+async def _search_hackathons_batch(coords: List[Tuple[float, float]]) -> List[List[dict]]:
+    """Resolve a burst of coordinates with one combined Tavily query.
+
+    All coordinates are reverse geocoded concurrently (cache hits are
+    free), their location parts are merged into a single OR alternation,
+    and the shared result list is then filtered per location so each
+    coordinate still gets its own relevance-checked subset.
+    """
+    year_strs, query_suffix = _query_parts()
+    parts_list = await asyncio.gather(
+        *(_reverse_geocode(round(lat, 3), round(lng, 3)) for lat, lng in coords),
+        return_exceptions=True,
+    )
+
+    location_strings = []
+    search_locations = []
+    for (lat, lng), parts in zip(coords, parts_list):
+        if isinstance(parts, BaseException) or not parts:
+            location_string = f"{lat:.2f}, {lng:.2f}"
+            terms = [location_string]
+        else:
+            location_string = ", ".join(parts)
+            terms = [f'"{p}"' for p in parts]
+        location_strings.append(location_string)
+        for term in terms:
+            if term not in search_locations:
+                search_locations.append(term)
+
+    search_query = _QUERY_PREFIX + " OR ".join(search_locations) + query_suffix
+    log.info(f"Using batched search query for {len(coords)} locations: {search_query}")
+    results = await _tavily_search(search_query)
+    log.info(f"Batched search returned {len(results)} results")
+
+    # Filter on a copy per location since title cleanup mutates results
+    return [
+        _filter_results([dict(r) for r in results], location_string, year_strs)
+        for location_string in location_strings
+    ]
+
+
+@function.defn()
+async def get_location_numbers_batch(params: LocationBatchParams) -> LocationBatchResponse:
+    try:
+        batched_results = await _search_hackathons_batch(
+            [(location.lat, location.lng) for location in params.locations]
+        )
+
+        responses = []
+        for location, search_results in zip(params.locations, batched_results):
+            responses.append(
+                LocationResponse(
+                    hackathons=[
+                        HackathonInfo(
+                            name=result.get("title", "Unnamed Hackathon"),
+                            description=result.get("snippet", "No description available"),
+                            location=f"Near {location.lat:.2f}, {location.lng:.2f}",
+                            date=result.get("published_date", None)
+                        )
+                        for result in search_results
+                    ]
+                )
+            )
+
+        return LocationBatchResponse(responses=responses)
+    except Exception as e:
+        log.error("location_numbers batch function failed", error=e)
+        return LocationBatchResponse(
+            responses=[LocationResponse(hackathons=[]) for _ in params.locations]
+        )
\ No newline at end of file
@@ -10,14 +10,14 @@ from src.functions.todo_create import todo_create
 from src.functions.llm_chat import llm_chat
 from watchfiles import run_process
 import webbrowser
-from src.functions.location_numbers import get_location_numbers
+from src.functions.location_numbers import get_location_numbers, get_location_numbers_batch
 
 
 async def main():
     await client.start_service(
         agents=[AgentTodo, AgentLocation],  # Add AgentLocation here
         workflows=[TodoExecute],
-        functions=[todo_create, get_random, get_result, llm_chat, get_location_numbers],
+        functions=[todo_create, get_random, get_result, llm_chat, get_location_numbers, get_location_numbers_batch],
     )
 
 def run_services():